@@ -28,6 +28,10 @@ CREATE TABLE public.form345_nonderiv_trans (
     shares_owned_following_transaction BIGINT
 );
 
+CREATE INDEX ix_f345_buy
+    ON public.form345_nonderiv_trans (issuer_cik, transaction_date)
+    WHERE transaction_code IN ('P', 'M');
+
 CREATE TABLE public.form345_reportingowner (
     submission_id TEXT,
     issuer_cik TEXT,
@@ -0,0 +1,12 @@
+"""
+Put the repository root on sys.path so scripts can import `src` when run directly.
+
+Scripts import this module for its side effect instead of repeating the shim.
+"""
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
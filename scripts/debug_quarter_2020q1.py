@@ -3,15 +3,12 @@
 Quick sanity check for the 2020q1 Form 3/4/5 TSVs (no DB involved).
 """
 
-import sys
 from pathlib import Path
 
 import pandas as pd
 
 # Allow running the script directly without installing the package.
-ROOT = Path(__file__).resolve().parents[1]
-if str(ROOT) not in sys.path:
-    sys.path.insert(0, str(ROOT))
+import _bootstrap  # noqa: F401
 
 from src.config import DATA_DIR
 
@@ -31,9 +28,16 @@ def main() -> None:
     show_head("NONDERIV_TRANS.tsv")
     show_head("DERIV_TRANS.tsv")
 
-    nonderiv = pd.read_csv(BASE / "NONDERIV_TRANS.tsv", sep="\t", dtype=str, na_filter=False)
+    # Only TRANS_CODE is needed; read it alone as a categorical (int codes, no str per cell).
+    trans_codes = pd.read_csv(
+        BASE / "NONDERIV_TRANS.tsv",
+        sep="\t",
+        usecols=["TRANS_CODE"],
+        dtype="category",
+        na_filter=False,
+    )
     print("\nNONDERIV_TRANS – TRANS_CODE value_counts:")
-    print(nonderiv["TRANS_CODE"].value_counts().head(20))
+    print(trans_codes["TRANS_CODE"].value_counts().head(20))
 
 
 if __name__ == "__main__":
@@ -3,18 +3,17 @@
 Quick sanity check script for loaded insider transactions.
 """
 
-from src.analytics.buy_signals import cluster_buys, fetch_buy_transactions
+from src.analytics.buy_signals import fetch_buy_clusters
 
 
 def main() -> None:
-    df = fetch_buy_transactions()
-    print(f"Fetched {len(df)} buy transactions")
+    clusters = fetch_buy_clusters()
+    print(f"Found {len(clusters)} buy clusters")
 
-    if df.empty:
+    if clusters.empty:
         print("No buy transactions found; check your source data.")
         return
 
-    clusters = cluster_buys(df)
     print(clusters.head())
 
 
@@ -2,62 +2,67 @@
 """
 Extract all .zip files in DATA_DIR into DATA_DIR/extracted, skipping ones already extracted.
 
-Keeps a simple log file (extracted.txt) in DATA_DIR listing processed zip filenames.
+Each extracted folder gets a .extracted_ok sentinel (holding the zip's mtime) written
+only after extraction finishes, so an interrupted run is retried on the next pass.
+Archives are independent, so they are extracted concurrently on a thread pool.
 """
 
-import sys
+import os
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
 
 # Allow running the script directly without installing the package.
-ROOT = Path(__file__).resolve().parents[1]
-if str(ROOT) not in sys.path:
-    sys.path.insert(0, str(ROOT))
+import _bootstrap  # noqa: F401
 
 from src.config import DATA_DIR
 
+SENTINEL_NAME = ".extracted_ok"
 
-def load_extracted_log(log_path: Path) -> set[str]:
-    if not log_path.exists():
-        return set()
-    return {line.strip() for line in log_path.read_text().splitlines() if line.strip()}
 
+def _extract_one(zip_path: Path, extracted_dir: Path) -> None:
+    target = extracted_dir / zip_path.stem
+    target.mkdir(parents=True, exist_ok=True)
+    print(f"Extracting {zip_path.name} to {target} ...")
+    with zipfile.ZipFile(zip_path, "r") as zf:
+        zf.extractall(target)
 
-def save_extracted_log(log_path: Path, entries: set[str]) -> None:
-    log_path.write_text("\n".join(sorted(entries)) + "\n")
+    # Write then rename so the sentinel only ever appears complete.
+    tmp = target / f"{SENTINEL_NAME}.tmp"
+    tmp.write_text(str(zip_path.stat().st_mtime_ns))
+    tmp.replace(target / SENTINEL_NAME)
 
 
 def main() -> None:
     data_dir = Path(DATA_DIR)
     extracted_dir = data_dir / "extracted"
-    log_path = data_dir / "extracted.txt"
-
     extracted_dir.mkdir(parents=True, exist_ok=True)
-    seen = load_extracted_log(log_path)
 
-    zip_files = sorted(data_dir.glob("*.zip"))
+    # scandir's dirents answer is_file() without an extra stat per entry; order
+    # does not matter since archives are extracted concurrently anyway.
+    zip_files = [
+        Path(entry.path)
+        for entry in os.scandir(data_dir)
+        if entry.name.endswith(".zip") and entry.is_file()
+    ]
     if not zip_files:
         print(f"No .zip files found in {data_dir}")
         return
 
-    new_extractions = 0
+    pending = []
     for zip_path in zip_files:
-        name = zip_path.name
-        if name in seen:
-            print(f"Skipping already extracted: {name}")
+        if (extracted_dir / zip_path.stem / SENTINEL_NAME).exists():
+            print(f"Skipping already extracted: {zip_path.name}")
             continue
+        pending.append(zip_path)
 
-        target = extracted_dir / zip_path.stem
-        target.mkdir(parents=True, exist_ok=True)
-        print(f"Extracting {name} to {target} ...")
-        with zipfile.ZipFile(zip_path, "r") as zf:
-            zf.extractall(target)
-
-        seen.add(name)
-        new_extractions += 1
+    extract = partial(_extract_one, extracted_dir=extracted_dir)
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        # Consume the iterator so worker exceptions propagate here.
+        list(executor.map(extract, pending))
 
-    save_extracted_log(log_path, seen)
-    print(f"Done. New extractions: {new_extractions}, total logged: {len(seen)}")
+    print(f"Done. New extractions: {len(pending)}, already extracted: {len(zip_files) - len(pending)}")
 
 
 if __name__ == "__main__":
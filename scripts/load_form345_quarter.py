@@ -5,21 +5,20 @@ Load all Form 3/4/5 quarter folders under DATA_DIR into Postgres staging tables.
 Keeps a log file (loaded_to_db.txt) in DATA_DIR to skip quarters already loaded.
 """
 
-import sys
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Iterable
 
-import pandas as pd
 from sqlalchemy import create_engine, text
-from sqlalchemy.engine import Engine
+from sqlalchemy.engine import Connection, Engine
 from sqlalchemy.inspection import inspect
 
 # Allow running the script directly without installing the package.
-ROOT = Path(__file__).resolve().parents[1]
-if str(ROOT) not in sys.path:
-    sys.path.insert(0, str(ROOT))
+import _bootstrap  # noqa: F401
 
 from src.config import DATA_DIR, DATABASE_URL
+from src.loaders.form345_loader import read_tsv_header
 
 TABLE_MAP = {
     "SUBMISSION.tsv": "form345_submission",
@@ -33,6 +32,70 @@ TABLE_MAP = {
     # "OWNER_SIGNATURE.tsv": "form345_owner_signature",
 }
 
+# Natural keys per table; a unique index on these makes reloading a quarter idempotent.
+TABLE_KEYS = {
+    "form345_submission": ("ACCESSION_NUMBER",),
+    "form345_reportingowner": ("ACCESSION_NUMBER", "RPTOWNERCIK"),
+    "form345_nonderiv_trans": ("ACCESSION_NUMBER", "NONDERIV_TRANS_SK"),
+    "form345_deriv_trans": ("ACCESSION_NUMBER", "DERIV_TRANS_SK"),
+}
+
+# Partial index serving fetch_buy_transactions / fetch_buy_clusters (buy codes only).
+BUY_INDEX_SQL = """
+    CREATE INDEX IF NOT EXISTS ix_f345_buy
+    ON form345_nonderiv_trans (issuer_cik, transaction_date)
+    WHERE transaction_code IN ('P', 'M')
+"""
+BUY_INDEX_COLUMNS = {"issuer_cik", "transaction_date", "transaction_code"}
+
+# Covering partial index for the insider_buy_signals view (cluster queries):
+# the view's purchase rows and the columns it reads from them, so the scan
+# of form345_nonderiv_trans can be index-only.
+SIGNAL_INDEX_SQL = """
+    CREATE INDEX IF NOT EXISTS ix_f345_signal_buys
+    ON form345_nonderiv_trans ("ACCESSION_NUMBER")
+    INCLUDE ("TRANS_DATE", "TRANS_SHARES", "TRANS_PRICEPERSHARE")
+    WHERE "TRANS_CODE" = 'P'
+"""
+SIGNAL_INDEX_COLUMNS = {"ACCESSION_NUMBER", "TRANS_CODE", "TRANS_DATE", "TRANS_SHARES", "TRANS_PRICEPERSHARE"}
+
+BUY_INDEXES = (
+    (BUY_INDEX_SQL, BUY_INDEX_COLUMNS),
+    (SIGNAL_INDEX_SQL, SIGNAL_INDEX_COLUMNS),
+)
+
+# Daily roll-up of insider_buy_signals that find_cluster_buys reads from when
+# present. The unique index is what REFRESH ... CONCURRENTLY requires; it leads
+# on transaction_date so the lookback range scan can use it too.
+CLUSTER_ROLLUP_VIEW = "mv_cluster_buy_daily"
+CLUSTER_ROLLUP_SQL = f"""
+    CREATE MATERIALIZED VIEW IF NOT EXISTS {CLUSTER_ROLLUP_VIEW} AS
+    SELECT
+        s.ticker,
+        s.transaction_date,
+        s.insider_name,
+        s.insider_relationship,
+        s.insider_title,
+        COUNT(*) AS num_trades,
+        SUM(s.shares) AS shares,
+        SUM(s.total_value) AS total_value
+    FROM insider_buy_signals s
+    WHERE s.transaction_date IS NOT NULL
+      AND s.ticker IS NOT NULL
+      AND s.ticker <> 'NONE'
+    GROUP BY s.ticker, s.transaction_date, s.insider_name, s.insider_relationship, s.insider_title
+    WITH NO DATA
+"""
+CLUSTER_ROLLUP_INDEX_SQL = f"""
+    CREATE UNIQUE INDEX IF NOT EXISTS ux_{CLUSTER_ROLLUP_VIEW}
+    ON {CLUSTER_ROLLUP_VIEW} (transaction_date, ticker, insider_name, insider_relationship, insider_title)
+"""
+# Single-ticker cluster queries (--ticker) seek straight to the ticker's days.
+CLUSTER_ROLLUP_TICKER_INDEX_SQL = f"""
+    CREATE INDEX IF NOT EXISTS ix_{CLUSTER_ROLLUP_VIEW}_ticker
+    ON {CLUSTER_ROLLUP_VIEW} (ticker, transaction_date)
+"""
+
 LOG_PATH = Path(DATA_DIR) / "loaded_to_db.txt"
 
 
@@ -42,43 +105,182 @@ def load_log() -> set[str]:
     return {line.strip() for line in LOG_PATH.read_text().splitlines() if line.strip()}
 
 
-def save_log(entries: set[str]) -> None:
-    LOG_PATH.write_text("\n".join(sorted(entries)) + "\n")
-
-
-def read_tsv(path: Path) -> pd.DataFrame:
-    print(f"Reading {path} ...")
-    return pd.read_csv(path, sep="\t", dtype=str, na_filter=False)
+def append_log(entry: str) -> None:
+    with LOG_PATH.open("a") as f:
+        f.write(entry + "\n")
 
 
 def quarter_dirs(base: Path) -> Iterable[Path]:
-    return sorted(p for p in base.glob("*_form345") if p.is_dir())
+    """Quarter folders in name order, using scandir's cached d_type instead of a stat each."""
+    entries = (e for e in os.scandir(base) if e.name.endswith("_form345") and e.is_dir())
+    return [Path(e.path) for e in sorted(entries, key=lambda e: e.name)]
 
 
-def ensure_columns(table: str, df: pd.DataFrame, engine: Engine) -> None:
+def existing_columns(engine: Engine) -> dict[str, set[str]]:
+    """Inspect the staging tables once and return {table: column names}."""
     inspector = inspect(engine)
-    if not inspector.has_table(table):
-        return  # table will be created by to_sql
+    return {
+        table: {col["name"] for col in inspector.get_columns(table)}
+        for table in TABLE_MAP.values()
+        if inspector.has_table(table)
+    }
+
+
+def ensure_columns(
+    table: str,
+    columns: list[str],
+    conn: Connection,
+    cols_by_table: dict[str, set[str]],
+) -> None:
+    """
+    Create the table or add missing TEXT columns, keeping cols_by_table in sync.
+    """
+    if table not in cols_by_table:
+        cols_sql = ", ".join(f'"{col}" TEXT' for col in columns)
+        conn.execute(text(f'CREATE TABLE "{table}" ({cols_sql})'))
+        cols_by_table[table] = set(columns)
+        return
 
-    existing_cols = {col["name"] for col in inspector.get_columns(table)}
-    missing = [col for col in df.columns if col not in existing_cols]
+    existing_cols = cols_by_table[table]
+    missing = [col for col in columns if col not in existing_cols]
     if not missing:
         return
 
+    # One statement: a single lock acquisition and catalog update for all columns.
+    add_sql = ", ".join(f'ADD COLUMN "{col}" TEXT' for col in missing)
+    conn.execute(text(f'ALTER TABLE "{table}" {add_sql}'))
+    existing_cols.update(missing)
+
+
+def ensure_unique_key(table: str, conn: Connection, cols_by_table: dict[str, set[str]]) -> None:
+    """
+    Create the unique index backing ON CONFLICT for tables with a known key.
+
+    Tables filled by older loader versions can hold duplicate keys (a quarter
+    that failed part-way was re-appended in full on the next run), so the
+    first time the index is built those duplicates are deleted, keeping the
+    earliest physical copy of each key.
+    """
+    key = TABLE_KEYS.get(table)
+    if not key or not set(key) <= cols_by_table.get(table, set()):
+        return
+    index = f"uq_{table}_key"
+    if conn.execute(text("SELECT to_regclass(:name)"), {"name": f'"{index}"'}).scalar() is not None:
+        return
+
+    match_sql = " AND ".join(f'a."{col}" = b."{col}"' for col in key)
+    deleted = conn.execute(
+        text(f'DELETE FROM "{table}" a USING "{table}" b WHERE {match_sql} AND a.ctid > b.ctid')
+    ).rowcount
+    if deleted:
+        print(f"Removed {deleted:,} duplicate rows from {table} before adding its unique key")
+    key_sql = ", ".join(f'"{col}"' for col in key)
+    conn.execute(text(f'CREATE UNIQUE INDEX IF NOT EXISTS "{index}" ON "{table}" ({key_sql})'))
+
+
+def copy_tsv(path: Path, table: str, columns: list[str], conn: Connection) -> int:
+    """
+    Stream a TSV into Postgres with COPY, bypassing pandas entirely.
+
+    Rows are copied into a temp staging table and then inserted with
+    ON CONFLICT DO NOTHING, so rows already present (re-runs, overlapping
+    quarters) are skipped server-side. Returns the number of new rows.
+
+    Quoting is disabled (SEC TSVs are unquoted) and FORCE_NOT_NULL keeps empty
+    fields as '' rather than NULL, matching the previous na_filter=False load.
+    """
+    cols = ", ".join(f'"{col}"' for col in columns)
+    stage = f"_stage_{table}"
+    copy_sql = (
+        f'COPY "{stage}" ({cols}) FROM STDIN WITH '
+        f"(FORMAT csv, DELIMITER E'\\t', HEADER true, QUOTE E'\\b', FORCE_NOT_NULL ({cols}))"
+    )
+    # COPY needs the psycopg2 cursor; it runs inside conn's open transaction.
+    cur = conn.connection.cursor()
+    try:
+        with path.open("rb") as f:
+            cur.execute(f'CREATE TEMP TABLE "{stage}" (LIKE "{table}" INCLUDING DEFAULTS)')
+            cur.copy_expert(copy_sql, f)
+            cur.execute(
+                f'INSERT INTO "{table}" ({cols}) SELECT {cols} FROM "{stage}" ON CONFLICT DO NOTHING'
+            )
+            rows = cur.rowcount
+            cur.execute(f'DROP TABLE "{stage}"')
+    finally:
+        cur.close()
+    return rows
+
+
+def _load_one(path: Path, table: str, engine: Engine, cols_by_table: dict[str, set[str]]) -> None:
+    """
+    Load one TSV in its own transaction on its own pooled connection.
+    """
+    columns = read_tsv_header(path)
     with engine.begin() as conn:
-        for col in missing:
-            conn.execute(text(f'ALTER TABLE "{table}" ADD COLUMN "{col}" TEXT'))
+        ensure_columns(table, columns, conn, cols_by_table)
+        ensure_unique_key(table, conn, cols_by_table)
+        print(f"Copying {path} to {table} ...")
+        rows = copy_tsv(path, table, columns, conn)
+    print(f"Wrote {rows:,} new rows from {path.name} to {table}")
 
 
-def load_quarter(dir_path: Path, engine: Engine) -> None:
-    for filename, table in TABLE_MAP.items():
-        path = dir_path / filename
+def ensure_buy_index(engine: Engine, cols_by_table: dict[str, set[str]]) -> None:
+    """
+    Idempotently create the partial buy indexes whose columns exist.
+    """
+    existing = cols_by_table.get("form345_nonderiv_trans", set())
+    statements = [sql for sql, columns in BUY_INDEXES if columns <= existing]
+    if not statements:
+        return
+    with engine.begin() as conn:
+        for sql in statements:
+            conn.execute(text(sql))
+
+
+def refresh_cluster_rollup(engine: Engine) -> None:
+    """
+    Create the cluster roll-up if the insider_buy_signals view exists, then refresh it.
+
+    The first refresh populates it; later ones run CONCURRENTLY so readers
+    keep seeing the previous contents until the new ones are swapped in.
+    """
+    with engine.begin() as conn:
+        if conn.execute(text("SELECT to_regclass('insider_buy_signals')")).scalar() is None:
+            return
+        conn.execute(text(CLUSTER_ROLLUP_SQL))
+        conn.execute(text(CLUSTER_ROLLUP_INDEX_SQL))
+        conn.execute(text(CLUSTER_ROLLUP_TICKER_INDEX_SQL))
+        populated = conn.execute(
+            text("SELECT ispopulated FROM pg_matviews WHERE matviewname = :name"),
+            {"name": CLUSTER_ROLLUP_VIEW},
+        ).scalar()
+        concurrently = "CONCURRENTLY " if populated else ""
+        print(f"Refreshing {CLUSTER_ROLLUP_VIEW} ...")
+        conn.execute(text(f"REFRESH MATERIALIZED VIEW {concurrently}{CLUSTER_ROLLUP_VIEW}"))
+
+
+def load_quarter(dir_path: Path, engine: Engine, cols_by_table: dict[str, set[str]]) -> None:
+    """
+    Load the quarter's TSVs concurrently, one thread and connection per table.
+
+    The files have no cross-dependencies, so parse, network COPY and the
+    server-side insert overlap across tables. Each file commits on its own;
+    a failed quarter is not logged, and re-running it is safe because the
+    inserts skip rows that already exist (ON CONFLICT DO NOTHING).
+    """
+    paths = {filename: dir_path / filename for filename in TABLE_MAP}
+    for path in paths.values():
         if not path.exists():
             raise FileNotFoundError(f"Expected file missing: {path}")
-        df = read_tsv(path)
-        print(f"Writing {len(df):,} rows from {path.name} to {table} ...")
-        ensure_columns(table, df, engine)
-        df.to_sql(table, engine, if_exists="append", index=False)
+
+    # Each worker touches only its own table's entry in cols_by_table.
+    with ThreadPoolExecutor(max_workers=len(TABLE_MAP)) as executor:
+        futures = [
+            executor.submit(_load_one, paths[filename], table, engine, cols_by_table)
+            for filename, table in TABLE_MAP.items()
+        ]
+        for future in futures:
+            future.result()
 
 
 def main() -> None:
@@ -90,6 +292,7 @@ def main() -> None:
         print(f"No quarter folders found in {DATA_DIR}")
         return
 
+    cols_by_table = existing_columns(engine)
     new_loads = 0
     for qdir in quarters:
         name = qdir.name
@@ -98,11 +301,15 @@ def main() -> None:
             continue
 
         print(f"\n=== Loading quarter: {name} ===")
-        load_quarter(qdir, engine)
+        load_quarter(qdir, engine, cols_by_table)
         already_loaded.add(name)
-        save_log(already_loaded)  # persist incrementally in case of later failures
+        append_log(name)  # persist incrementally in case of later failures
         new_loads += 1
 
+    if new_loads:
+        ensure_buy_index(engine, cols_by_table)
+        refresh_cluster_rollup(engine)
+
     print(f"\nDone. New quarters loaded: {new_loads}, total logged: {len(already_loaded)}")
 
 
@@ -5,8 +5,6 @@ CLI entry point to load Form 3/4/5 TSVs for a given quarter.
 
 import argparse
 
-from src.loaders.form345_loader import load_quarter
-
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="Load Form 3/4/5 TSVs into Postgres")
@@ -21,6 +19,9 @@ def main() -> None:
     )
     args = parser.parse_args()
 
+    # Deferred so --help and argument errors don't pay for SQLAlchemy.
+    from src.loaders.form345_loader import load_quarter
+
     total = load_quarter(args.path, table=args.table or "form345_raw")
     print(f"Inserted {total} rows from {args.path}")
 
@@ -5,13 +5,10 @@ CLI to display top insider cluster buy events.
 
 import argparse
 import sys
-from pathlib import Path
 from typing import Any, List
 
 # Allow running the script directly without installing the package.
-ROOT = Path(__file__).resolve().parents[1]
-if str(ROOT) not in sys.path:
-    sys.path.insert(0, str(ROOT))
+import _bootstrap  # noqa: F401
 
 try:
     from tabulate import tabulate
@@ -25,16 +22,45 @@ except Exception:  # pragma: no cover - optional dependency
     Console = None
     Table = None
 
-from src.analytics.cluster_buys import get_top_cluster_buys
+
+HAS_TOTAL_INSIDERS = 1
+HAS_FUND_LIST = 2
+HAS_ROLE_SCORE = 4
+HAS_KEY_ROLES = 8
+HAS_CLUSTER_SCORE = 16
+ALL_COLUMN_FLAGS = 31
+
+
+def column_flags(rows: List[Any]) -> int:
+    """
+    Single pass over rows collecting which optional columns have data.
+    """
+    flags = 0
+    for row in rows:
+        if "num_total_insiders" in row:
+            flags |= HAS_TOTAL_INSIDERS
+        if row.get("fund_like_insiders"):
+            flags |= HAS_FUND_LIST
+        if "role_score" in row:
+            flags |= HAS_ROLE_SCORE
+        if row.get("key_roles"):
+            flags |= HAS_KEY_ROLES
+        if "cluster_score" in row:
+            flags |= HAS_CLUSTER_SCORE
+        if flags == ALL_COLUMN_FLAGS:
+            break
+    return flags
 
 
 def format_rows(rows: List[Any]) -> None:
-    has_total_insiders = any("num_total_insiders" in row for row in rows)
-    has_fund_list = any(row.get("fund_like_insiders") for row in rows)
-    has_role_score = any("role_score" in row for row in rows)
-    has_key_roles = any(row.get("key_roles") for row in rows)
-    has_cluster_score = any("cluster_score" in row for row in rows)
-    if Console and Table:
+    flags = column_flags(rows)
+    has_total_insiders = bool(flags & HAS_TOTAL_INSIDERS)
+    has_fund_list = bool(flags & HAS_FUND_LIST)
+    has_role_score = bool(flags & HAS_ROLE_SCORE)
+    has_key_roles = bool(flags & HAS_KEY_ROLES)
+    has_cluster_score = bool(flags & HAS_CLUSTER_SCORE)
+    # Piped output skips rich (console setup + ANSI negotiation) when tabulate can render it.
+    if Console and Table and (sys.stdout.isatty() or not tabulate):
         console = Console()
         table = Table(show_header=True, header_style="bold cyan", box=box.MARKDOWN)
         columns = [
@@ -125,7 +151,7 @@ def main() -> None:
         "--max-fund-ratio",
         type=float,
         default=None,
-        help="Maximum Funds/All ratio (e.g., 0.5 keeps clusters with <=50% funds)",
+        help="Maximum Funds/All ratio (e.g., 0.5 keeps clusters with <=50%% funds)",
     )
     parser.add_argument(
         "--min-cluster-score",
@@ -140,6 +166,9 @@ def main() -> None:
     )
     args = parser.parse_args()
 
+    # Deferred so --help and argument errors don't pay for pandas/SQLAlchemy.
+    from src.analytics.cluster_buys import get_top_cluster_buys
+
     df = get_top_cluster_buys(
         limit=args.limit,
         window_days=args.window_days,
@@ -4,12 +4,23 @@ Helpers for generating insider buy signals from loaded Form 3/4/5 data.
 
 from __future__ import annotations
 
+import numpy as np
 import pandas as pd
+from sqlalchemy import text
 from sqlalchemy.engine import Engine
 
 from src.config import get_engine
 
 NONDERIV_TABLE = "form345_nonderiv_trans"
+FETCH_CHUNK_SIZE = 50_000
+# Columns identifying a single trade; amended filings repeat these verbatim.
+TRADE_KEY_COLUMNS = [
+    "reporting_owner_cik",
+    "issuer_cik",
+    "transaction_date",
+    "transaction_shares",
+    "transaction_price_per_share",
+]
 
 
 def fetch_buy_transactions(engine: Engine | None = None) -> pd.DataFrame:
@@ -17,15 +28,35 @@ def fetch_buy_transactions(engine: Engine | None = None) -> pd.DataFrame:
     Return a DataFrame of buy-side non-derivative transactions.
 
     Filters on transaction_code of common buy indicators (P = purchase,
-    M = conversion of derivative security).
+    M = conversion of derivative security). Only the columns used by
+    cluster_buys are selected, and rows are streamed through a server-side
+    cursor in chunks so the client never buffers the full result set twice.
+    Rows come back ordered by (issuer_cik, transaction_date), which the
+    partial buy index serves without a sort and lets cluster_buys skip its
+    own. Duplicate trades (same owner, issuer, date, shares and price) are dropped
+    using a 64-bit row hash.
     """
     engine = engine or get_engine()
     query = f"""
-        select *
+        select
+            rpt_owner_cik as reporting_owner_cik,
+            issuer_cik,
+            transaction_date,
+            transaction_shares,
+            transaction_price_per_share,
+            transaction_code
         from {NONDERIV_TABLE}
         where transaction_code in ('P', 'M')
+        order by issuer_cik, transaction_date
     """
-    return pd.read_sql_query(query, engine)
+    with engine.connect().execution_options(
+        stream_results=True, max_row_buffer=FETCH_CHUNK_SIZE
+    ) as conn:
+        chunks = pd.read_sql_query(query, conn, chunksize=FETCH_CHUNK_SIZE)
+        df = pd.concat(chunks, ignore_index=True)
+
+    keys = pd.util.hash_pandas_object(df[TRADE_KEY_COLUMNS], index=False)
+    return df[~keys.duplicated().to_numpy()].reset_index(drop=True)
 
 
 def cluster_buys(df: pd.DataFrame, window_days: int = 14) -> pd.DataFrame:
@@ -33,28 +64,122 @@ def cluster_buys(df: pd.DataFrame, window_days: int = 14) -> pd.DataFrame:
     Create simple cluster buy signals by grouping insider purchases within a window.
 
     Expects columns: reporting_owner_cik, issuer_cik, transaction_date.
+
+    Cluster boundaries and aggregates are computed on sorted numpy arrays
+    (factorized issuer codes + int64 nanosecond timestamps) rather than via
+    object-dtype groupby/diff/cumsum.
     """
-    working = df.copy()
-    working["transaction_date"] = pd.to_datetime(working["transaction_date"])
-    working.sort_values(["issuer_cik", "transaction_date"], inplace=True)
+    columns = ["start_date", "end_date", "filings", "insiders", "cluster_span_days"]
+    # Work on the three required columns as arrays; no copy of df is made.
+    dates = pd.to_datetime(df["transaction_date"])
+    issuer_codes, _ = pd.factorize(df["issuer_cik"], sort=True)
+    owner_codes, owner_uniques = pd.factorize(df["reporting_owner_cik"])
+    ts = dates.to_numpy(dtype="datetime64[ns]").view("i8")
 
-    # Group consecutive buys for the same issuer within the specified window.
-    working["cluster_id"] = (
-        working.groupby("issuer_cik")["transaction_date"]
-        .diff()
-        .gt(pd.Timedelta(days=window_days))
-        .cumsum()
-    )
+    # Rows without an issuer or a date cannot be placed in a window.
+    valid = (issuer_codes >= 0) & ~dates.isna().to_numpy()
+    issuer_codes, owner_codes, ts = issuer_codes[valid], owner_codes[valid], ts[valid]
+    n = len(ts)
+    if n == 0:
+        return pd.DataFrame(columns=columns)
 
-    agg = (
-        working.groupby(["issuer_cik", "cluster_id"])
-        .agg(
-            start_date=("transaction_date", "min"),
-            end_date=("transaction_date", "max"),
-            filings=("transaction_date", "count"),
-            insiders=("reporting_owner_cik", pd.Series.nunique),
-        )
-        .reset_index(drop=True)
+    # Input from fetch_buy_transactions is usually already in (issuer, date) order.
+    code_steps = np.diff(issuer_codes)
+    presorted = bool(np.all((code_steps > 0) | ((code_steps == 0) & (np.diff(ts) >= 0))))
+    if presorted:
+        codes_s, ts_s, owners_s = issuer_codes, ts, owner_codes
+    else:
+        order = np.lexsort((ts, issuer_codes))
+        codes_s, ts_s, owners_s = issuer_codes[order], ts[order], owner_codes[order]
+
+    # A new cluster starts at each issuer change or when the gap to the previous
+    # buy for the same issuer exceeds the window.
+    window_ns = pd.Timedelta(days=window_days).value
+    new_cluster = np.empty(n, dtype=bool)
+    new_cluster[0] = True
+    new_cluster[1:] = (codes_s[1:] != codes_s[:-1]) | (np.diff(ts_s) > window_ns)
+    starts = np.flatnonzero(new_cluster)
+    ends = np.append(starts[1:], n) - 1
+    cluster_id = np.cumsum(new_cluster) - 1
+
+    filings = np.add.reduceat(np.ones(n, dtype=np.int64), starts)
+
+    # Distinct insiders per cluster: unique (cluster, owner) pairs, missing owners skipped.
+    has_owner = owners_s >= 0
+    n_owners = max(len(owner_uniques), 1)
+    pairs = np.unique(cluster_id[has_owner] * n_owners + owners_s[has_owner])
+    insiders = np.bincount(pairs // n_owners, minlength=len(starts))
+
+    agg = pd.DataFrame(
+        {
+            "start_date": ts_s[starts].view("datetime64[ns]"),
+            "end_date": ts_s[ends].view("datetime64[ns]"),
+            "filings": filings,
+            "insiders": insiders,
+        }
     )
     agg["cluster_span_days"] = (agg["end_date"] - agg["start_date"]).dt.days + 1
     return agg
+
+
+def fetch_buy_clusters(engine: Engine | None = None, window_days: int = 14) -> pd.DataFrame:
+    """
+    Compute cluster_buys(fetch_buy_transactions(), window_days) inside Postgres.
+
+    Gaps are found with LAG over each issuer's purchases and cluster ids with a
+    running SUM, so only one row per cluster crosses the wire instead of every
+    transaction; those are streamed through a server-side cursor in chunks.
+    Returns the same columns as cluster_buys.
+    """
+    engine = engine or get_engine()
+    query = f"""
+        with trades as (
+            select distinct
+                rpt_owner_cik,
+                issuer_cik,
+                transaction_date,
+                transaction_shares,
+                transaction_price_per_share
+            from {NONDERIV_TABLE}
+            where transaction_code in ('P', 'M')
+              and issuer_cik is not null
+              and transaction_date is not null
+        ),
+        marked as (
+            select
+                issuer_cik,
+                rpt_owner_cik,
+                transaction_date,
+                case
+                    when transaction_date - lag(transaction_date) over w > :window_days then 1
+                    else 0
+                end as new_cluster
+            from trades
+            window w as (partition by issuer_cik order by transaction_date)
+        ),
+        clustered as (
+            select
+                *,
+                sum(new_cluster) over (partition by issuer_cik order by transaction_date) as cluster_id
+            from marked
+        )
+        select
+            min(transaction_date) as start_date,
+            max(transaction_date) as end_date,
+            count(*) as filings,
+            count(distinct rpt_owner_cik) as insiders,
+            max(transaction_date) - min(transaction_date) + 1 as cluster_span_days
+        from clustered
+        group by issuer_cik, cluster_id
+        order by issuer_cik, cluster_id
+    """
+    with engine.connect().execution_options(
+        stream_results=True, max_row_buffer=FETCH_CHUNK_SIZE
+    ) as conn:
+        chunks = pd.read_sql_query(
+            text(query), conn, params={"window_days": window_days}, chunksize=FETCH_CHUNK_SIZE
+        )
+        agg = pd.concat(chunks, ignore_index=True)
+    for col in ("start_date", "end_date"):
+        agg[col] = pd.to_datetime(agg[col])
+    return agg
@@ -1,46 +1,80 @@
 from __future__ import annotations
 
+import time
 from dataclasses import dataclass
 from datetime import date, timedelta
 from typing import Any, Dict, Optional
 
+import numpy as np
 import pandas as pd
 from sqlalchemy import text
 from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Session
 
-from src.config import DATABASE_URL, get_engine
-from src.cluster_scoring import compute_cluster_score
-from src.insider_classification import get_or_create_insider_entity, normalize_insider_name
+try:
+    import connectorx as cx
+except ImportError:  # pragma: no cover - optional dependency
+    cx = None
+
+from src.config import get_engine
+from src.cluster_scoring import compute_cluster_score_vec
+from src.insider_classification import get_or_create_insider_entities, normalize_insider_name
 from src.insider_roles import compute_insider_role_weight
 
 
-def _first_nonempty(series: pd.Series) -> str:
-    """
-    Helper for groupby aggregations to pull the first non-blank string.
+FETCH_CHUNK_SIZE = 50_000
+# Dtypes of the cluster query rows, pinned so the connectorx and psycopg2
+# read paths hand the same frame to find_cluster_buys.
+CLUSTER_ROW_DATE_COLUMNS = ("transaction_date", "window_start", "window_end")
+CLUSTER_ROW_NUMERIC_DTYPES = {"num_trades": "int64", "shares": "float64", "total_value": "float64"}
+
+# Columns of the (empty) frame returned when no window qualifies.
+WINDOW_COLUMNS = [
+    "ticker",
+    "window_start",
+    "window_end",
+    "num_trades",
+    "num_insiders",
+    "total_shares",
+    "total_value",
+    "top_insiders",
+]
+RESULT_COLUMNS = [
+    "ticker",
+    "window_start",
+    "window_end",
+    "num_trades",
+    "num_insiders",
+    "num_total_insiders",
+    "num_fund_like",
+    "total_shares",
+    "total_value",
+    "top_insiders",
+    "fund_like_insiders",
+    "role_score",
+    "num_key_officers",
+    "has_cfo",
+    "has_gc",
+    "has_ceo",
+    "key_roles",
+    "cluster_score",
+]
+
+
+def _format_insider_labels(names: pd.Series, relationships: pd.Series, titles: pd.Series) -> pd.Series:
     """
-    for value in series:
-        if isinstance(value, str):
-            trimmed = value.strip()
-            if trimmed:
-                return trimmed
-    return ""
-
-
-def _format_insider_label(
-    name: str, relationship: str | None, title: str | None
-) -> str:
-    rel = (relationship or "").strip()
-    role = (title or "").strip()
-
-    if rel.lower() == "officer":
-        descriptor = f"Officer, {role}" if role else "Officer"
-    elif rel and role:
-        descriptor = f"{rel}, {role}"
-    else:
-        descriptor = rel or role
+    Vectorized "Name (Relationship, Title)" labels.
 
-    return f"{name} ({descriptor})" if descriptor else name
+    An officer's relationship is always shown as "Officer"; when only one of
+    relationship/title is present it is shown alone, and with neither the
+    label is just the name.
+    """
+    rel = relationships.fillna("").astype(str).str.strip()
+    role = titles.fillna("").astype(str).str.strip()
+    rel = rel.mask(rel.str.lower().eq("officer"), "Officer")
+    # With one side blank, rel + role is simply the other side.
+    descriptor = (rel + ", " + role).where(rel.ne("") & role.ne(""), rel + role)
+    return names.where(descriptor.eq(""), names + " (" + descriptor + ")")
 
 
 def _flag_value(value: object) -> bool:
@@ -61,19 +95,46 @@ def _flag_value(value: object) -> bool:
     return str(value).strip().lower() in {"1", "true", "t", "yes", "y"}
 
 
-def _derive_flags(row: pd.Series) -> Dict[str, bool]:
+FLAG_COLUMNS = ("is_director", "is_officer", "is_ten_percent_owner", "is_other")
+
+# Relationship substrings (lowercased) that imply each flag.
+FLAG_PATTERNS = {
+    "is_director": "director",
+    "is_officer": "officer",
+    "is_ten_percent_owner": "ten percent|10%",
+    "is_other": "other",
+}
+
+# Upper-cased title substrings behind the has_cfo / has_gc / has_ceo columns.
+KEY_ROLE_PATTERNS = {
+    "has_cfo": "CFO|CHIEF FINANCIAL OFFICER",
+    "has_gc": "GENERAL COUNSEL|CHIEF LEGAL OFFICER",
+    "has_ceo": "CEO|CHIEF EXECUTIVE OFFICER",
+}
+
+
+def _flag_series(values: pd.Series) -> pd.Series:
     """
-    Derive insider flags from row metadata.
+    Vectorized _flag_value over a column.
     """
-    relationship = str(row.get("insider_relationship", "") or "").lower()
-    return {
-        "is_director": _flag_value(row.get("is_director")) or "director" in relationship,
-        "is_officer": _flag_value(row.get("is_officer")) or "officer" in relationship,
-        "is_ten_percent_owner": _flag_value(row.get("is_ten_percent_owner"))
-        or "ten percent" in relationship
-        or "10%" in relationship,
-        "is_other": _flag_value(row.get("is_other")) or "other" in relationship,
-    }
+    if pd.api.types.is_bool_dtype(values) or pd.api.types.is_numeric_dtype(values):
+        return values.fillna(0).astype(bool)
+    return values.map(_flag_value, na_action="ignore").fillna(False).astype(bool)
+
+
+def _derive_flags(base_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Derive insider flag columns from explicit flag columns and the relationship text.
+    """
+    relationship = base_df["insider_relationship"].str.lower()
+    flags = {}
+    for flag_col, pattern in FLAG_PATTERNS.items():
+        from_text = relationship.str.contains(pattern, regex=True, na=False)
+        if flag_col in base_df:
+            flags[flag_col] = _flag_series(base_df[flag_col]) | from_text
+        else:
+            flags[flag_col] = from_text
+    return pd.DataFrame(flags, index=base_df.index)
 
 
 def _classify_insiders(base_df: pd.DataFrame, engine: Engine) -> Dict[str, Dict[str, Any]]:
@@ -85,28 +146,32 @@ def _classify_insiders(base_df: pd.DataFrame, engine: Engine) -> Dict[str, Dict[
         return {}
 
     unique_rows = base_df.drop_duplicates(subset=["normalized_name"])
-    classifications: Dict[str, Dict[str, Any]] = {}
-    with Session(bind=engine, expire_on_commit=False) as session:
-        for _, row in unique_rows.iterrows():
-            normalized = row.get("normalized_name") or ""
-            if not normalized:
-                continue
-            flags = _derive_flags(row)
-            insider_id = None
-            if "insider_cik" in row and pd.notna(row.get("insider_cik")):
-                insider_id = str(row.get("insider_cik"))
-            entity = get_or_create_insider_entity(
-                session=session,
-                insider_name=row.get("insider_name", normalized),
-                officer_title=row.get("insider_title"),
-                flags=flags,
-                insider_id=insider_id,
-            )
-            classifications[normalized] = {
-                "is_fund_like": bool(entity.is_fund_like),
-                "entity_type": entity.entity_type,
+    has_cik = "insider_cik" in unique_rows
+    records = []
+    for row in unique_rows.itertuples(index=False):
+        if not row.normalized_name:
+            continue
+        insider_id = None
+        if has_cik and pd.notna(row.insider_cik):
+            insider_id = str(row.insider_cik)
+        records.append(
+            {
+                "insider_name": row.insider_name,
+                "officer_title": row.insider_title,
+                "flags": {flag_col: bool(getattr(row, flag_col)) for flag_col in FLAG_COLUMNS},
+                "insider_id": insider_id,
             }
-    return classifications
+        )
+
+    with Session(bind=engine, expire_on_commit=False) as session:
+        entities = get_or_create_insider_entities(session, records)
+    return {
+        normalized: {
+            "is_fund_like": bool(entity.is_fund_like),
+            "entity_type": entity.entity_type,
+        }
+        for normalized, entity in entities.items()
+    }
 
 
 @dataclass
@@ -121,25 +186,105 @@ class ClusterBuyEvent:
     top_insiders: list[str]
 
 
-def _get_engine() -> Engine:
-    if not DATABASE_URL:
-        raise RuntimeError("DATABASE_URL is not set; configure it in .env")
-    try:
-        return get_engine()
-    except Exception as exc:  # pragma: no cover - passthrough for clarity
-        raise RuntimeError(f"Failed to create engine for DATABASE_URL: {exc}") from exc
+# Seconds to reuse state that only changes when the quarter loader runs
+# (MAX(filing_date), roll-up availability), so repeated calls in one process
+# (UI refreshes, batch runs) skip the round-trip.
+LOADER_STATE_TTL = 300.0
+_latest_filing_date: Optional[tuple[float, date]] = None
 
 
 def get_latest_filing_date() -> date:
-    engine = _get_engine()
+    global _latest_filing_date
+    now = time.monotonic()
+    if _latest_filing_date is not None and now - _latest_filing_date[0] < LOADER_STATE_TTL:
+        return _latest_filing_date[1]
+
+    engine = get_engine()
     with engine.connect() as conn:
         result = conn.execute(text("SELECT MAX(filing_date) AS latest FROM insider_buy_signals;"))
         latest = result.scalar()
     if latest is None:
         raise RuntimeError("insider_buy_signals is empty; cannot determine latest filing date")
+    _latest_filing_date = (now, latest)
     return latest
 
 
+# Active exclusion patterns folded into one case-insensitive regex, built once
+# per query: each row gets a single regex match instead of a correlated
+# ILIKE '%pattern%' probe per pattern. Regex metacharacters are escaped and
+# the LIKE wildcards % and _ translated, so matches are the same as ILIKE's.
+EXCLUSIONS_REGEX_SQL = r"""
+                  SELECT string_agg(
+                      replace(replace(regexp_replace(e.pattern, '([.^$*+?()\[\]{}|\\-])', '\\\1', 'g'), '%', '.*'), '_', '.'),
+                      '|'
+                  )
+                  FROM insider_exclusions e
+                  WHERE e.active
+"""
+
+# Optional daily roll-up of insider_buy_signals (see README, section 1.3),
+# refreshed by the quarter loader. When it is populated the cluster query
+# starts from its pre-summed rows instead of re-joining the raw tables.
+CLUSTER_ROLLUP_VIEW = "mv_cluster_buy_daily"
+# A newly populated roll-up is picked up within LOADER_STATE_TTL; a dropped
+# one is caught by find_cluster_buys, which re-checks with refresh=True.
+_cluster_rollup_available: Optional[tuple[float, bool]] = None
+
+
+def cluster_rollup_available(engine: Engine, refresh: bool = False) -> bool:
+    global _cluster_rollup_available
+    now = time.monotonic()
+    if (
+        not refresh
+        and _cluster_rollup_available is not None
+        and now - _cluster_rollup_available[0] < LOADER_STATE_TTL
+    ):
+        return _cluster_rollup_available[1]
+
+    with engine.connect() as conn:
+        populated = conn.execute(
+            text("SELECT ispopulated FROM pg_matviews WHERE matviewname = :name"),
+            {"name": CLUSTER_ROLLUP_VIEW},
+        ).scalar()
+    _cluster_rollup_available = (now, bool(populated))
+    return bool(populated)
+
+
+def _normalize_cluster_rows(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Give the cluster rows the same dtypes whichever reader fetched them.
+
+    connectorx returns dates as datetime64 where psycopg2 returns date
+    objects; both become date objects, which the output uses.
+    """
+    for col in CLUSTER_ROW_DATE_COLUMNS:
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = df[col].dt.date
+    return df.astype(CLUSTER_ROW_NUMERIC_DTYPES)
+
+
+def _read_cluster_rows(engine: Engine, query: str, params: Dict[str, Any]) -> pd.DataFrame:
+    """
+    Run the cluster query and return its rows.
+
+    With connectorx installed the result is fetched over Arrow in one pass
+    (it takes no bind parameters, so psycopg2 renders them into the SQL).
+    connectorx opens its own connection from the engine URL, so it does not
+    use the engine's pool or connect_args. Without it the rows are streamed
+    through a server-side cursor in chunks.
+    """
+    if cx is not None:
+        compiled = text(query).compile(dialect=engine.dialect)
+        with engine.connect() as conn, conn.connection.cursor() as cursor:
+            sql = cursor.mogrify(str(compiled), compiled.construct_params(params)).decode()
+        url = engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+        return _normalize_cluster_rows(cx.read_sql(url, sql, return_type="pandas"))
+
+    with engine.connect().execution_options(stream_results=True, max_row_buffer=FETCH_CHUNK_SIZE) as conn:
+        chunks = pd.read_sql_query(text(query), conn, params=params, chunksize=FETCH_CHUNK_SIZE)
+        return _normalize_cluster_rows(pd.concat(chunks, ignore_index=True))
+
+
 def find_cluster_buys(
     window_days: int = 10,
     lookback_days: int = 90,
@@ -156,22 +301,47 @@ def find_cluster_buys(
     latest_date = get_latest_filing_date()
     start_date = latest_date - timedelta(days=lookback_days)
 
-    engine = _get_engine()
+    engine = get_engine()
     window_interval = window_days - 1
 
     ticker_filter = "AND s.ticker = :ticker" if ticker else ""
     value_filter = "AND COALESCE(total_value, 0) >= :min_trade_value" if min_trade_value else ""
-    exclusions_clause = """
-              AND NOT EXISTS (
-                  SELECT 1
-                  FROM insider_exclusions e
-                  WHERE e.active
-                    AND s.insider_name ILIKE ('%' || e.pattern || '%')
-              )
+    exclusions_clause = f"""
+              AND NOT COALESCE(s.insider_name ~* ({EXCLUSIONS_REGEX_SQL}), false)
     """ if use_exclusions else ""
-    query = f"""
-        WITH base AS (
-            SELECT s.*
+    # The roll-up is already summed per day, so it cannot apply the per-trade
+    # min_trade_value filter; exclusions only look at insider_name and still work.
+    use_rollup = not min_trade_value and cluster_rollup_available(engine)
+    rollup_cte = f"""
+        -- Pre-summed (ticker, day, insider listing) rows from the roll-up.
+        daily AS (
+            SELECT
+                s.ticker,
+                s.transaction_date,
+                s.insider_name,
+                s.insider_relationship,
+                s.insider_title,
+                s.num_trades,
+                s.shares,
+                s.total_value
+            FROM {CLUSTER_ROLLUP_VIEW} s
+            WHERE s.transaction_date BETWEEN :start_date AND :end_date
+              {exclusions_clause}
+            {ticker_filter}
+        ),"""
+    base_cte = f"""
+        base AS NOT MATERIALIZED (
+            -- Only the columns read below, so unused view columns are never
+            -- computed; NOT MATERIALIZED lets the planner inline it into its
+            -- reference instead of spooling it to a tuplestore (PG12+).
+            SELECT
+                s.ticker,
+                s.transaction_date,
+                s.insider_name,
+                s.insider_relationship,
+                s.insider_title,
+                s.shares,
+                s.total_value
             FROM insider_buy_signals s
             WHERE s.transaction_date BETWEEN :start_date AND :end_date
               AND s.ticker IS NOT NULL
@@ -180,85 +350,106 @@ def find_cluster_buys(
               {exclusions_clause}
             {ticker_filter}
         ),
-        computed AS (
+        -- Trades collapsed to one row per (ticker, day, insider listing), so
+        -- pandas only sees pre-summed rows; the window CTEs below build on it
+        -- so the view is scanned once.
+        daily AS (
             SELECT
                 b.ticker,
-                (b.transaction_date - INTERVAL '{window_interval} day')::date AS window_start,
-                b.transaction_date::date AS window_end,
-                (
-                    SELECT COUNT(*)
-                    FROM base b2
-                    WHERE b2.ticker = b.ticker
-                      AND b2.transaction_date BETWEEN b.transaction_date - INTERVAL '{window_interval} day' AND b.transaction_date
-                ) AS num_trades,
-                (
-                    SELECT COUNT(DISTINCT b2.insider_name)
-                    FROM base b2
-                    WHERE b2.ticker = b.ticker
-                      AND b2.transaction_date BETWEEN b.transaction_date - INTERVAL '{window_interval} day' AND b.transaction_date
-                ) AS num_insiders,
-                (
-                    SELECT SUM(b2.shares)
-                    FROM base b2
-                    WHERE b2.ticker = b.ticker
-                      AND b2.transaction_date BETWEEN b.transaction_date - INTERVAL '{window_interval} day' AND b.transaction_date
-                ) AS total_shares,
-                (
-                    SELECT SUM(b2.total_value)
-                    FROM base b2
-                    WHERE b2.ticker = b.ticker
-                      AND b2.transaction_date BETWEEN b.transaction_date - INTERVAL '{window_interval} day' AND b.transaction_date
-                ) AS total_value,
-                (
-                    SELECT string_agg(
-                        CASE
-                            WHEN LOWER(COALESCE(insider_relationship, '')) = 'officer' AND COALESCE(insider_title, '') <> ''
-                                THEN insider_name || ' (Officer, ' || insider_title || ')'
-                            WHEN LOWER(COALESCE(insider_relationship, '')) = 'officer'
-                                THEN insider_name || ' (Officer)'
-                            WHEN COALESCE(insider_relationship, '') <> '' AND COALESCE(insider_title, '') <> ''
-                                THEN insider_name || ' (' || insider_relationship || ', ' || insider_title || ')'
-                            WHEN COALESCE(insider_relationship, '') <> ''
-                                THEN insider_name || ' (' || insider_relationship || ')'
-                            WHEN COALESCE(insider_title, '') <> ''
-                                THEN insider_name || ' (' || insider_title || ')'
-                            ELSE insider_name
-                        END,
-                        ', ' ORDER BY sum_total_value DESC
-                    )
-                    FROM (
-                        SELECT
-                            insider_name,
-                            SUM(total_value) AS sum_total_value,
-                            MIN(insider_relationship) AS insider_relationship,
-                            MIN(insider_title) AS insider_title
-                        FROM base b3
-                        WHERE b3.ticker = b.ticker
-                          AND b3.transaction_date BETWEEN b.transaction_date - INTERVAL '{window_interval} day' AND b.transaction_date
-                        GROUP BY insider_name
-                        ORDER BY sum_total_value DESC
-                    ) top3
-                ) AS top_insiders,
-            b.transaction_date
-        FROM base b
-    ),
-    filtered AS (
-            SELECT *
-            FROM computed
-            WHERE num_insiders >= :min_insiders
-              AND total_value >= :min_total_value
+                b.transaction_date,
+                b.insider_name,
+                b.insider_relationship,
+                b.insider_title,
+                COUNT(*) AS num_trades,
+                SUM(b.shares) AS shares,
+                SUM(b.total_value) AS total_value
+            FROM base b
+            GROUP BY b.ticker, b.transaction_date, b.insider_name, b.insider_relationship, b.insider_title
+        ),"""
+    windows_sql = f"""
+        -- COUNT(DISTINCT) is not allowed as a window aggregate, so distinct
+        -- insiders are counted with +1/-1 events: each (insider, day) covers
+        -- the days up to its window end or the insider's next trade, and a
+        -- running sum of the events gives the insiders active in the window.
+        insider_days AS (
+            SELECT
+                ticker,
+                transaction_date AS day,
+                LEAST(
+                    LEAD(transaction_date) OVER (PARTITION BY ticker, insider_name ORDER BY transaction_date) - 1,
+                    transaction_date + {window_interval}
+                ) AS covered_until,
+                (insider_name IS NOT NULL)::int AS delta
+            FROM (SELECT DISTINCT ticker, insider_name, transaction_date FROM daily) d
+        ),
+        insider_counts AS (
+            SELECT ticker, day, SUM(SUM(delta)) OVER (PARTITION BY ticker ORDER BY day) AS num_insiders
+            FROM (
+                SELECT ticker, day, delta FROM insider_days
+                UNION ALL
+                SELECT ticker, covered_until + 1, -delta FROM insider_days
+            ) events
+            GROUP BY ticker, day
+        ),
+        -- One row per (ticker, day): each trailing window is summed once per
+        -- day rather than once per trade or insider row.
+        day_windows AS (
+            SELECT
+                d.ticker,
+                d.transaction_date AS day,
+                SUM(SUM(d.total_value)) OVER (
+                    PARTITION BY d.ticker
+                    ORDER BY d.transaction_date
+                    RANGE BETWEEN INTERVAL '{window_interval} day' PRECEDING AND CURRENT ROW
+                ) AS window_value
+            FROM daily d
+            GROUP BY d.ticker, d.transaction_date
+        ),
+        -- Days whose trailing window qualifies, merged into islands: all
+        -- windows are equally long, so a day starts a new island when the
+        -- previous qualifying day of its ticker ended more than a window ago.
+        qualifying AS (
+            SELECT
+                dw.ticker,
+                dw.day,
+                dw.day - LAG(dw.day) OVER (PARTITION BY dw.ticker ORDER BY dw.day) AS gap
+            FROM day_windows dw
+            JOIN insider_counts ic
+              ON ic.ticker = dw.ticker
+             AND ic.day = dw.day
+            WHERE ic.num_insiders >= :min_insiders
+              AND dw.window_value >= :min_total_value
+        ),
+        islands AS (
+            SELECT
+                ticker,
+                day,
+                SUM(CASE WHEN gap IS NULL OR gap > {window_interval} THEN 1 ELSE 0 END)
+                    OVER (PARTITION BY ticker ORDER BY day) AS island
+            FROM qualifying
+        ),
+        merged AS (
+            SELECT ticker, MIN(day) - {window_interval} AS window_start, MAX(day) AS window_end
+            FROM islands
+            GROUP BY ticker, island
         )
-        SELECT DISTINCT ON (ticker, window_start, window_end)
-            ticker,
-            window_start,
-            window_end,
-            num_trades,
-            num_insiders,
-            total_shares,
-            total_value,
-            COALESCE(top_insiders, '') AS top_insiders
-        FROM filtered
-        ORDER BY ticker, window_start, window_end, transaction_date DESC;
+        -- Only the daily rows inside a merged window, tagged with its bounds;
+        -- text comes back non-null so pandas can use it as is.
+        SELECT
+            d.ticker,
+            d.transaction_date,
+            COALESCE(d.insider_name, '') AS insider_name,
+            COALESCE(d.insider_relationship, '') AS insider_relationship,
+            COALESCE(d.insider_title, '') AS insider_title,
+            d.num_trades,
+            d.shares,
+            d.total_value,
+            m.window_start,
+            m.window_end
+        FROM daily d
+        JOIN merged m
+          ON m.ticker = d.ticker
+         AND d.transaction_date BETWEEN m.window_start AND m.window_end;
     """
 
     params = {
@@ -266,205 +457,119 @@ def find_cluster_buys(
         "end_date": latest_date,
         "min_insiders": min_insiders,
         "min_total_value": min_total_value,
-        "min_trade_value": min_trade_value,
     }
+    if value_filter:
+        params["min_trade_value"] = min_trade_value
     if ticker:
         params["ticker"] = ticker
 
-    df = pd.read_sql_query(text(query), engine, params=params)
-
-    # Ensure correct types.
-    for col in ("window_start", "window_end"):
-        if col in df:
-            df[col] = pd.to_datetime(df[col]).dt.date
-    if "top_insiders" in df:
-        df["top_insiders"] = df["top_insiders"].fillna("")
-
-    if df.empty:
-        return df
-
-    # Fetch base transactions to recompute metrics for merged windows.
-    base_ticker_filter = "AND ticker = :ticker" if ticker else ""
-    base_value_filter = "AND COALESCE(total_value, 0) >= :min_trade_value" if min_trade_value else ""
-    base_exclusions = """
-          AND NOT EXISTS (
-              SELECT 1
-              FROM insider_exclusions e
-              WHERE e.active
-                AND insider_name ILIKE ('%' || e.pattern || '%')
-          )
-    """ if use_exclusions else ""
-    base_sql = f"""
-        SELECT
-            ticker,
-            transaction_date,
-            insider_name,
-            insider_relationship,
-            insider_title,
-            shares,
-            total_value
-        FROM insider_buy_signals
-        WHERE transaction_date BETWEEN :start_date AND :end_date
-          AND ticker IS NOT NULL
-          AND ticker <> 'NONE'
-          {base_value_filter}
-          {base_exclusions}
-        {base_ticker_filter}
-    """
-    base_params = params.copy()
-    base_params["min_trade_value"] = min_trade_value
-    base_df = pd.read_sql_query(text(base_sql), engine, params=base_params)
+    try:
+        base_df = _read_cluster_rows(engine, f"WITH {rollup_cte if use_rollup else base_cte}{windows_sql}", params)
+    except Exception:
+        # A cached "available" can outlive a dropped roll-up; if it is really
+        # gone now, answer from insider_buy_signals instead of failing.
+        if not use_rollup or cluster_rollup_available(engine, refresh=True):
+            raise
+        base_df = _read_cluster_rows(engine, f"WITH {base_cte}{windows_sql}", params)
     if base_df.empty:
-        return pd.DataFrame(columns=df.columns)
+        return pd.DataFrame(columns=WINDOW_COLUMNS)
+
+    # Every row belongs to exactly one merged window; number the windows in
+    # (ticker, window_start) order.
+    window_keys = ["ticker", "window_start", "window_end"]
+    base_df["window_id"] = base_df.groupby(window_keys).ngroup()
+    merged = base_df.drop_duplicates("window_id").set_index("window_id")[window_keys].sort_index()
+    base_df = base_df.drop(columns=["window_start", "window_end"])
 
-    base_df["transaction_date"] = pd.to_datetime(base_df["transaction_date"]).dt.date
     base_df["shares"] = pd.to_numeric(base_df["shares"], errors="coerce").fillna(0.0)
     base_df["total_value"] = pd.to_numeric(base_df["total_value"], errors="coerce").fillna(0.0)
-    if "insider_name" not in base_df.columns:
-        base_df["insider_name"] = ""
-    else:
-        base_df["insider_name"] = base_df["insider_name"].fillna("").astype(str)
-    for col in ("insider_relationship", "insider_title"):
-        if col not in base_df.columns:
-            base_df[col] = ""
-        else:
-            base_df[col] = base_df[col].fillna("").astype(str)
-    base_df["normalized_name"] = base_df["insider_name"].fillna("").astype(str).map(normalize_insider_name)
-    flags_df = base_df.apply(_derive_flags, axis=1, result_type="expand")
-    for flag_col in ("is_director", "is_officer", "is_ten_percent_owner", "is_other"):
-        if flag_col in flags_df:
-            base_df[flag_col] = flags_df[flag_col].fillna(False).astype(bool)
-        elif flag_col not in base_df.columns:
-            base_df[flag_col] = False
+    # The trimmed copies of the text columns (blanks as NaN) let the C-level
+    # "first" aggregation pick each insider's first non-blank value.
+    for col in ("insider_name", "insider_relationship", "insider_title"):
+        trimmed = base_df[col].str.strip()
+        base_df[f"{col}_nz"] = trimmed.where(trimmed.ne(""))
+    # Insiders repeat across many rows; normalize each distinct spelling once.
+    insider_names = base_df["insider_name"]
+    normalized_by_name = {name: normalize_insider_name(name) for name in insider_names.unique()}
+    base_df["normalized_name"] = insider_names.map(normalized_by_name)
+    base_df[list(FLAG_COLUMNS)] = _derive_flags(base_df)
+    title_upper = base_df["insider_title"].str.upper()
+    for role_col, pattern in KEY_ROLE_PATTERNS.items():
+        base_df[role_col] = title_upper.str.contains(pattern, regex=True, na=False)
+    # Role weight depends only on (title, director, officer); score each
+    # distinct combination once and broadcast back via the group codes.
+    role_keys = ["insider_title", "is_director", "is_officer"]
+    role_combos = base_df.drop_duplicates(role_keys)
+    role_weights = np.array(
+        [
+            compute_insider_role_weight(officer_title=title, is_director=bool(director), is_officer=bool(officer))
+            for title, director, officer in zip(
+                role_combos["insider_title"], role_combos["is_director"], role_combos["is_officer"]
+            )
+        ],
+        dtype=np.int64,
+    )
+    base_df["role_weight"] = role_weights[base_df.groupby(role_keys, sort=False).ngroup().to_numpy()]
 
     classifications = _classify_insiders(base_df, engine)
-    if classifications:
-        base_df["is_fund_like"] = base_df["normalized_name"].map(
-            lambda n: bool(classifications[n]["is_fund_like"]) if n in classifications else False
+    fund_like_map = {name: bool(c["is_fund_like"]) for name, c in classifications.items()}
+    entity_type_map = {name: c["entity_type"] for name, c in classifications.items()}
+    base_df["is_fund_like"] = base_df["normalized_name"].map(fund_like_map).fillna(False).astype(bool)
+    base_df["entity_type"] = base_df["normalized_name"].map(entity_type_map).fillna("")
+    # Low-cardinality sort/groupby keys as categoricals: they work on int codes.
+    for col in ("ticker", "normalized_name"):
+        base_df[col] = base_df[col].astype("category")
+
+    # Date order within each ticker, so "first" below means earliest.
+    base_df = base_df.sort_values(["ticker", "transaction_date"], kind="stable").reset_index(drop=True)
+
+    # One groupby over all merged windows instead of a slice + groupby each.
+    totals = base_df.groupby("window_id").agg(
+        num_trades=("num_trades", "sum"),
+        total_shares=("shares", "sum"),
+        total_value=("total_value", "sum"),
+    )
+    insiders = (
+        base_df.groupby(["window_id", "normalized_name"], observed=True)
+        .agg(
+            insider_name=("insider_name_nz", "first"),
+            total_value=("total_value", "sum"),
+            relationship=("insider_relationship_nz", "first"),
+            title=("insider_title_nz", "first"),
+            is_fund_like=("is_fund_like", "max"),
+            has_cfo=("has_cfo", "max"),
+            has_gc=("has_gc", "max"),
+            has_ceo=("has_ceo", "max"),
+            role_weight=("role_weight", "max"),
         )
-        base_df["entity_type"] = base_df["normalized_name"].map(
-            lambda n: classifications[n]["entity_type"] if n in classifications else ""
-        )
-    else:
-        base_df["is_fund_like"] = False
-        base_df["entity_type"] = ""
-
-    merged_records = []
-    for ticker_value, tdf in df.groupby("ticker"):
-        intervals = sorted(zip(tdf["window_start"], tdf["window_end"]), key=lambda x: x[0])
-        merged_intervals: list[tuple[date, date]] = []
-        for start, end in intervals:
-            if not merged_intervals:
-                merged_intervals.append((start, end))
-                continue
-            last_start, last_end = merged_intervals[-1]
-            if start <= last_end:  # overlap condition
-                merged_intervals[-1] = (last_start, max(last_end, end))
-            else:
-                merged_intervals.append((start, end))
-
-        ticker_rows = base_df[base_df["ticker"] == ticker_value]
-        for start, end in merged_intervals:
-            subset = ticker_rows[
-                (ticker_rows["transaction_date"] >= start) & (ticker_rows["transaction_date"] <= end)
-            ]
-            if subset.empty:
-                continue
-            num_trades = len(subset)
-            total_shares = subset["shares"].sum()
-            total_value = subset["total_value"].sum()
-            grouped = (
-                subset.groupby("normalized_name")
-                .agg(
-                    insider_name=("insider_name", _first_nonempty),
-                    total_value=("total_value", "sum"),
-                    relationship=("insider_relationship", _first_nonempty),
-                    title=("insider_title", _first_nonempty),
-                    is_fund_like=("is_fund_like", "max"),
-                    is_director=("is_director", "max"),
-                    is_officer=("is_officer", "max"),
-                )
-                .sort_values("total_value", ascending=False)
-            )
-            people: list[str] = []
-            fund_like_labels: list[str] = []
-            role_score = 0
-            num_key_officers = 0
-            has_cfo = False
-            has_gc = False
-            has_ceo = False
-            for _, row in grouped.iterrows():
-                label = _format_insider_label(
-                    row.get("insider_name") or "",
-                    row.get("relationship"),
-                    row.get("title"),
-                )
-                if row.get("is_fund_like"):
-                    fund_like_labels.append(label)
-                else:
-                    people.append(label)
-                    weight = compute_insider_role_weight(
-                        officer_title=row.get("title"),
-                        is_director=bool(row.get("is_director")),
-                        is_officer=bool(row.get("is_officer")),
-                    )
-                    role_score += weight
-                    if weight >= 3:
-                        num_key_officers += 1
-                    title_u = str(row.get("title") or "").upper()
-                    if "CFO" in title_u or "CHIEF FINANCIAL OFFICER" in title_u:
-                        has_cfo = True
-                    if "GENERAL COUNSEL" in title_u or "CHIEF LEGAL OFFICER" in title_u:
-                        has_gc = True
-                    if "CEO" in title_u or "CHIEF EXECUTIVE OFFICER" in title_u:
-                        has_ceo = True
-
-            num_people = len(people)
-            num_fund_like = len(fund_like_labels)
-            total_unique_insiders = len(grouped.index)
-            top_insiders = ", ".join(people)
-            fund_like_insiders = ", ".join(fund_like_labels)
-            key_roles = []
-            if has_cfo:
-                key_roles.append("CFO")
-            if has_gc:
-                key_roles.append("GC")
-            if has_ceo:
-                key_roles.append("CEO")
-            cluster_score = compute_cluster_score(
-                people=num_people,
-                role_score=role_score,
-                total_value_usd=total_value,
-                funds=num_fund_like,
-                all_insiders=total_unique_insiders,
-            )
-            merged_records.append(
-                {
-                    "ticker": ticker_value,
-                    "window_start": start,
-                    "window_end": end,
-                    "num_trades": int(num_trades),
-                    "num_insiders": int(num_people),
-                    "num_total_insiders": int(total_unique_insiders),
-                    "num_fund_like": int(num_fund_like),
-                    "total_shares": float(total_shares),
-                    "total_value": float(total_value),
-                    "top_insiders": top_insiders,
-                    "fund_like_insiders": fund_like_insiders,
-                    "role_score": int(role_score),
-                    "num_key_officers": int(num_key_officers),
-                    "has_cfo": has_cfo,
-                    "has_gc": has_gc,
-                    "has_ceo": has_ceo,
-                    "key_roles": ", ".join(key_roles),
-                    "cluster_score": float(cluster_score),
-                }
-            )
-
-    if not merged_records:
-        return pd.DataFrame(columns=df.columns)
-
-    merged_df = pd.DataFrame(merged_records)
+        .fillna({"insider_name": "", "relationship": "", "title": ""})
+        .reset_index()
+        .sort_values(["window_id", "total_value"], ascending=[True, False], kind="stable")
+    )
+    people = insiders[~insiders["is_fund_like"]]
+    funds = insiders[insiders["is_fund_like"]]
+    by_person = people.groupby("window_id")
+
+    windows = totals.index
+    merged_df = merged.loc[windows].reset_index(drop=True)
+    merged_df["window_id"] = windows.to_numpy()
+    merged_df["num_trades"] = totals["num_trades"].to_numpy().astype(int)
+    merged_df["num_insiders"] = by_person.size().reindex(windows, fill_value=0).to_numpy()
+    merged_df["num_total_insiders"] = insiders.groupby("window_id").size().reindex(windows).to_numpy()
+    merged_df["num_fund_like"] = funds.groupby("window_id").size().reindex(windows, fill_value=0).to_numpy()
+    merged_df["total_shares"] = totals["total_shares"].to_numpy(dtype=float)
+    merged_df["total_value"] = totals["total_value"].to_numpy(dtype=float)
+    merged_df["role_score"] = by_person["role_weight"].sum().reindex(windows, fill_value=0).to_numpy()
+    merged_df["cluster_score"] = compute_cluster_score_vec(
+        people=merged_df["num_insiders"],
+        role_score=merged_df["role_score"],
+        total_value_usd=merged_df["total_value"],
+        funds=merged_df["num_fund_like"],
+        all_insiders=merged_df["num_total_insiders"],
+    )
+
+    # Apply the numeric thresholds before any label formatting, so tight
+    # filters skip the string work for windows that would be dropped anyway.
     if min_insiders:
         merged_df = merged_df[merged_df["num_insiders"] >= min_insiders]
     if min_people is not None:
@@ -477,7 +582,28 @@ def find_cluster_buys(
         denom = merged_df["num_total_insiders"].replace(0, 1)
         merged_df = merged_df[(merged_df["num_fund_like"] / denom) <= max_fund_ratio]
 
-    merged_df = merged_df.sort_values(
+    kept = pd.Index(merged_df.pop("window_id"))
+    insiders = insiders[insiders["window_id"].isin(kept)].copy()
+    insiders["label"] = _format_insider_labels(insiders["insider_name"], insiders["relationship"], insiders["title"])
+    people = insiders[~insiders["is_fund_like"]]
+    funds = insiders[insiders["is_fund_like"]]
+    by_person = people.groupby("window_id")
+
+    merged_df["top_insiders"] = by_person["label"].agg(", ".join).reindex(kept, fill_value="").to_numpy()
+    merged_df["fund_like_insiders"] = (
+        funds.groupby("window_id")["label"].agg(", ".join).reindex(kept, fill_value="").to_numpy()
+    )
+    merged_df["num_key_officers"] = (
+        (people["role_weight"] >= 3).groupby(people["window_id"]).sum().reindex(kept, fill_value=0).to_numpy()
+    )
+    for role_col in KEY_ROLE_PATTERNS:
+        merged_df[role_col] = by_person[role_col].any().reindex(kept, fill_value=False).to_numpy(dtype=bool)
+    merged_df["key_roles"] = [
+        ", ".join(role for role, present in zip(("CFO", "GC", "CEO"), flags) if present)
+        for flags in zip(merged_df["has_cfo"], merged_df["has_gc"], merged_df["has_ceo"])
+    ]
+
+    merged_df = merged_df[RESULT_COLUMNS].sort_values(
         by=["cluster_score", "role_score", "num_insiders", "total_value", "num_fund_like"],
         ascending=[False, False, False, False, True],
     ).reset_index(drop=True)
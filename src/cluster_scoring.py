@@ -5,6 +5,15 @@ Composite cluster scoring for insider buy windows.
 from __future__ import annotations
 
 import math
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+
+W_ROLE = 2.0
+W_PEOPLE = 1.0
+W_VALUE = 2.0
+W_FUND = 2.0  # penalty
 
 
 def compute_cluster_score(
@@ -32,15 +41,43 @@ def compute_cluster_score(
     value_score = math.log10(total_value_usd + 1.0) if total_value_usd > 0 else 0.0
     fund_ratio = funds / all_insiders
 
-    w_role = 2.0
-    w_people = 1.0
-    w_value = 2.0
-    w_fund = 2.0  # penalty
-
     score = (
-        w_role * role_score
-        + w_people * people
-        + w_value * value_score
-        - w_fund * fund_ratio
+        W_ROLE * role_score
+        + W_PEOPLE * people
+        + W_VALUE * value_score
+        - W_FUND * fund_ratio
     )
     return score
+
+
+def compute_cluster_score_vec(
+    people,
+    role_score,
+    total_value_usd,
+    funds,
+    all_insiders,
+) -> np.ndarray:
+    """
+    Vectorized compute_cluster_score over equal-length array-likes.
+
+    Same heuristics and weights, one NumPy pass instead of a call per window;
+    missing values count as zero like in the scalar version. NumPy is
+    imported here so scalar-only callers never load it.
+    """
+    import numpy as np
+
+    def _counts(values) -> np.ndarray:
+        return np.nan_to_num(np.asarray(values, dtype=np.float64)).astype(np.int64)
+
+    all_insiders = np.maximum(_counts(all_insiders), 1)
+    people = _counts(people)
+    role_score = _counts(role_score)
+    funds = _counts(funds)
+    total_value_usd = np.nan_to_num(np.asarray(total_value_usd, dtype=np.float64))
+
+    positive = total_value_usd > 0
+    value_score = np.zeros_like(total_value_usd)
+    value_score[positive] = np.log10(total_value_usd[positive] + 1.0)
+    fund_ratio = funds / all_insiders
+
+    return W_ROLE * role_score + W_PEOPLE * people + W_VALUE * value_score - W_FUND * fund_ratio
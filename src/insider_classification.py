@@ -4,9 +4,12 @@ Insider entity classification helpers with a rule-based pass and AI stub.
 
 from __future__ import annotations
 
-from typing import Any, Dict, Optional
+import re
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Optional
 
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 
 from src.models import InsiderEntity, ensure_tables
@@ -37,6 +40,8 @@ FUND_TOKENS = [
     " TRUST",
     " FOUNDATION",
 ]
+# All tokens in one pattern: deciding fund vs person is a single scan.
+FUND_TOKEN_RE = re.compile("|".join(re.escape(token) for token in FUND_TOKENS))
 
 HIGH_CONFIDENCE_THRESHOLD = 0.8
 RULE_CONFIDENCE_FUND = 0.8
@@ -57,19 +62,17 @@ def normalize_insider_name(name: str) -> str:
     return " ".join((name or "").upper().split())
 
 
-def classify_insider_by_rules(
-    name: str,
-    officer_title: Optional[str],
-    flags: Optional[Dict[str, Any]] = None,
-) -> Dict[str, Any]:
+@lru_cache(maxsize=131072)
+def _classify_by_rules_cached(
+    name_u: str,
+    has_title: bool,
+    is_officer: bool,
+    is_director: bool,
+) -> tuple[str, bool, float, str]:
     """
-    Rule-based classifier using name/title heuristics only.
+    Pure core of classify_insider_by_rules, memoized on its hashable inputs.
     """
-    flags = flags or {}
-    name_u = (name or "").upper()
-    title_u = (officer_title or "").upper()
-
-    is_fund_like = any(token in name_u for token in FUND_TOKENS)
+    is_fund_like = FUND_TOKEN_RE.search(name_u) is not None
     entity_type = ENTITY_FUND if is_fund_like else ENTITY_PERSON
     confidence = RULE_CONFIDENCE_FUND if is_fund_like else RULE_CONFIDENCE_PERSON
 
@@ -80,20 +83,38 @@ def classify_insider_by_rules(
             rationale_parts.append(f"Matched fund token(s): {', '.join(hits)}")
         else:
             rationale_parts.append("Name resembles fund or legal entity")
-    elif flags.get("is_officer") or flags.get("is_director"):
+    elif is_officer or is_director:
         rationale_parts.append("Flagged as officer/director")
         confidence = max(confidence, 0.7)
-    elif title_u:
+    elif has_title:
         rationale_parts.append("Officer title present")
     else:
         rationale_parts.append("Defaulted to person; no fund markers detected")
 
+    return entity_type, is_fund_like, confidence, "; ".join(rationale_parts)
+
+
+def classify_insider_by_rules(
+    name: str,
+    officer_title: Optional[str],
+    flags: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Rule-based classifier using name/title heuristics only.
+    """
+    flags = flags or {}
+    entity_type, is_fund_like, confidence, rationale = _classify_by_rules_cached(
+        (name or "").upper(),
+        bool(officer_title),
+        bool(flags.get("is_officer")),
+        bool(flags.get("is_director")),
+    )
     return {
         "entity_type": entity_type,
         "is_fund_like": is_fund_like,
         "source": "rules",
         "confidence": confidence,
-        "rationale": "; ".join(rationale_parts),
+        "rationale": rationale,
     }
 
 
@@ -122,6 +143,34 @@ def classify_insider_with_ai(
     return ai_result
 
 
+def _classify_entity_values(
+    normalized_name: str,
+    insider_name: str,
+    officer_title: Optional[str],
+    flags: Optional[Dict[str, Any]],
+    insider_id: Optional[str],
+) -> Dict[str, Any]:
+    """
+    Classify an insider with rules (AI fallback) and return InsiderEntity column values.
+    """
+    flags = flags or {}
+    rules_result = classify_insider_by_rules(insider_name, officer_title, flags)
+    result = rules_result
+    if rules_result.get("confidence", 0.0) < HIGH_CONFIDENCE_THRESHOLD:
+        ai_result = classify_insider_with_ai(insider_name, officer_title, flags)
+        if ai_result:
+            result = ai_result
+
+    return {
+        "insider_id": insider_id,
+        "normalized_name": normalized_name,
+        "entity_type": result.get("entity_type", ENTITY_UNKNOWN),
+        "is_fund_like": bool(result.get("is_fund_like")),
+        "source": result.get("source", "rules"),
+        "confidence": float(result.get("confidence", 1.0)),
+    }
+
+
 def get_or_create_insider_entity(
     session: Session,
     insider_name: str,
@@ -131,50 +180,87 @@ def get_or_create_insider_entity(
 ) -> InsiderEntity:
     """
     Fetch a cached classification or create one using rules with AI fallback.
-    """
-    ensure_tables(session.get_bind())
 
+    Thin wrapper around get_or_create_insider_entities for a single insider.
+    """
     normalized_name = normalize_insider_name(insider_name)
     if not normalized_name:
         raise ValueError("insider_name is required for classification")
 
-    existing = (
-        session.query(InsiderEntity)
-        .filter(InsiderEntity.normalized_name == normalized_name)
-        .one_or_none()
-    )
-    if existing:
-        return existing
+    record = {
+        "insider_name": insider_name,
+        "officer_title": officer_title,
+        "flags": flags,
+        "insider_id": insider_id,
+    }
+    return get_or_create_insider_entities(session, [record])[normalized_name]
 
-    flags = flags or {}
-    rules_result = classify_insider_by_rules(insider_name, officer_title, flags)
-    result = rules_result
-    if rules_result.get("confidence", 0.0) < HIGH_CONFIDENCE_THRESHOLD:
-        ai_result = classify_insider_with_ai(insider_name, officer_title, flags)
-        if ai_result:
-            result = ai_result
 
-    entity = InsiderEntity(
-        insider_id=insider_id,
-        normalized_name=normalized_name,
-        entity_type=result.get("entity_type", ENTITY_UNKNOWN),
-        is_fund_like=bool(result.get("is_fund_like")),
-        source=result.get("source", "rules"),
-        confidence=float(result.get("confidence", 1.0)),
-    )
-    session.add(entity)
-    try:
-        session.commit()
-    except IntegrityError:
-        session.rollback()
-        existing = (
-            session.query(InsiderEntity)
-            .filter(InsiderEntity.normalized_name == normalized_name)
-            .one_or_none()
+def preload_entities(session: Session, names: Iterable[str]) -> Dict[str, InsiderEntity]:
+    """
+    Fetch the stored entities for many insider names with one SELECT.
+
+    Names are normalized first; returns normalized_name -> entity for the
+    ones that already exist.
+    """
+    normalized = {normalize_insider_name(name) for name in names}
+    normalized.discard("")
+    if not normalized:
+        return {}
+    lookup = select(InsiderEntity).where(InsiderEntity.normalized_name.in_(list(normalized)))
+    return {entity.normalized_name: entity for entity in session.scalars(lookup)}
+
+
+def get_or_create_insider_entities(
+    session: Session,
+    records: Iterable[Dict[str, Any]],
+) -> Dict[str, InsiderEntity]:
+    """
+    Batch version of get_or_create_insider_entity.
+
+    Each record holds insider_name and optionally officer_title, flags and
+    insider_id. Existing entities are fetched with one SELECT and the missing
+    ones inserted in one multi-row INSERT ... ON CONFLICT DO NOTHING, instead
+    of a round-trip (or two) per insider. Returns normalized_name -> entity;
+    records with a blank name are skipped. New rows are committed, so pass a
+    session with expire_on_commit=False to avoid reloading each entity.
+    """
+    ensure_tables(session.get_bind())
+
+    pending: Dict[str, Dict[str, Any]] = {}
+    for record in records:
+        normalized_name = normalize_insider_name(record.get("insider_name"))
+        if normalized_name and normalized_name not in pending:
+            pending[normalized_name] = record
+    if not pending:
+        return {}
+
+    entities = preload_entities(session, pending)
+
+    missing = [name for name in pending if name not in entities]
+    if missing:
+        values = [
+            _classify_entity_values(
+                name,
+                pending[name].get("insider_name"),
+                pending[name].get("officer_title"),
+                pending[name].get("flags"),
+                pending[name].get("insider_id"),
+            )
+            for name in missing
+        ]
+        stmt = (
+            pg_insert(InsiderEntity)
+            .on_conflict_do_nothing(index_elements=["normalized_name"])
+            .returning(InsiderEntity)
         )
-        if existing:
-            return existing
-        raise
+        for entity in session.scalars(stmt, values):
+            entities[entity.normalized_name] = entity
+        session.commit()
+
+        # Rows inserted concurrently by another process return nothing above.
+        raced = [name for name in missing if name not in entities]
+        if raced:
+            entities.update(preload_entities(session, raced))
 
-    session.refresh(entity)
-    return entity
+    return entities
@@ -4,6 +4,8 @@ Role-based weighting for insiders based on officer titles and flags.
 
 from __future__ import annotations
 
+import re
+from functools import lru_cache
 from typing import Optional
 
 ROLE_WEIGHTS: dict[str, int] = {
@@ -30,7 +32,16 @@ ROLE_WEIGHTS: dict[str, int] = {
     "DIRECTOR": 1,
 }
 
+# One alternation per weight, heaviest first: the first tier that matches
+# anywhere in the title holds the max weight. (A single alternation would
+# return the leftmost match, not the heaviest.)
+ROLE_WEIGHT_TIERS: list[tuple[int, re.Pattern[str]]] = [
+    (weight, re.compile("|".join(re.escape(key) for key, w in ROLE_WEIGHTS.items() if w == weight)))
+    for weight in sorted(set(ROLE_WEIGHTS.values()), reverse=True)
+]
 
+
+@lru_cache(maxsize=131072)
 def compute_insider_role_weight(
     officer_title: Optional[str],
     is_director: bool,
@@ -40,14 +51,12 @@ def compute_insider_role_weight(
     Determine an insider's role weight based on their title/flags.
     """
     title_u = (officer_title or "").upper()
-    max_weight = 0
-    for key, weight in ROLE_WEIGHTS.items():
-        if key in title_u:
-            max_weight = max(max_weight, weight)
-    if max_weight == 0:
-        if is_officer:
-            return ROLE_WEIGHTS.get("OFFICER", 1)
-        if is_director:
-            return ROLE_WEIGHTS.get("DIRECTOR", 1)
-        return 0
-    return max_weight
+    if title_u:
+        for weight, pattern in ROLE_WEIGHT_TIERS:
+            if pattern.search(title_u):
+                return weight
+    if is_officer:
+        return ROLE_WEIGHTS.get("OFFICER", 1)
+    if is_director:
+        return ROLE_WEIGHTS.get("DIRECTOR", 1)
+    return 0
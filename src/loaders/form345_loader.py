@@ -8,15 +8,24 @@ target table, defaulting to `form345_raw`.
 
 from __future__ import annotations
 
+import csv
+import os
 import pathlib
+from concurrent.futures import ThreadPoolExecutor
 from typing import Iterable, Optional
 
-import pandas as pd
+from sqlalchemy import text
 from sqlalchemy.engine import Engine
 
 from src.config import DATA_DIR, get_engine
 
 DEFAULT_TABLE = "form345_raw"
+# Bytes read from the TSV per COPY write; bounds memory while streaming a file
+# without paying psycopg2's default of one round of I/O per 8 KiB.
+COPY_CHUNK_SIZE = 1 << 20
+# Files copied at once by load_quarter; stays under the engine's default pool
+# size so no worker waits on (and times out for) a connection.
+MAX_LOAD_WORKERS = 4
 
 
 def discover_tsvs(path: pathlib.Path) -> Iterable[pathlib.Path]:
@@ -30,17 +39,60 @@ def discover_tsvs(path: pathlib.Path) -> Iterable[pathlib.Path]:
             yield candidate
 
 
+def read_tsv_header(file_path: pathlib.Path) -> list[str]:
+    """Raw column names from the TSV's first line."""
+    with file_path.open(newline="") as f:
+        return next(csv.reader(f, delimiter="\t"), [])
+
+
+def tsv_columns(file_path: pathlib.Path) -> list[str]:
+    """Column names from the TSV header, normalized for SQL identifiers."""
+    return [col.strip().lower() for col in read_tsv_header(file_path)]
+
+
+def ensure_table(table: str, columns: list[str], engine: Engine) -> None:
+    """Create the target table with TEXT columns if it does not exist yet."""
+    cols_sql = ", ".join(f'"{col}" TEXT' for col in columns)
+    with engine.begin() as conn:
+        conn.execute(text(f'CREATE TABLE IF NOT EXISTS "{table}" ({cols_sql})'))
+
+
+def copy_tsv(file_path: pathlib.Path, columns: list[str], table: str, engine: Engine) -> int:
+    """
+    Stream a TSV into Postgres with COPY, without parsing it client-side.
+
+    psycopg2 reads the file COPY_CHUNK_SIZE bytes at a time and the server
+    skips the header row, so memory stays flat regardless of file size.
+    Quoting is disabled (SEC TSVs are unquoted), so '"' is stored verbatim.
+    Empty fields load as NULL. Returns the number of rows copied.
+    """
+    cols = ", ".join(f'"{col}"' for col in columns)
+    copy_sql = f"""
+        COPY "{table}" ({cols}) FROM STDIN
+        WITH (FORMAT csv, DELIMITER E'\\t', HEADER true, QUOTE E'\\b')
+    """
+
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        with file_path.open("rb") as f:
+            cur.copy_expert(copy_sql, f, size=COPY_CHUNK_SIZE)
+        rows = cur.rowcount
+        raw.commit()
+    finally:
+        raw.close()
+    return rows
+
+
 def load_file(file_path: pathlib.Path, engine: Engine, table: str = DEFAULT_TABLE) -> int:
     """
     Load a single TSV file into the specified Postgres table.
 
     Returns the number of rows written.
     """
-    df = pd.read_csv(file_path, sep="\t", dtype=str)
-    # Normalize column names for consistency with SQL identifiers.
-    df.columns = [col.strip().lower() for col in df.columns]
-    df.to_sql(table, engine, if_exists="append", index=False, method="multi")
-    return len(df.index)
+    columns = tsv_columns(file_path)
+    ensure_table(table, columns, engine)
+    return copy_tsv(file_path, columns, table, engine)
 
 
 def load_quarter(
@@ -62,7 +114,13 @@ def load_quarter(
         base = default_dir
 
     engine = engine or get_engine()
-    total_rows = 0
-    for tsv in discover_tsvs(base):
-        total_rows += load_file(tsv, engine, table=table)
-    return total_rows
+    tsvs = list(discover_tsvs(base))
+    # Create the table up front so the concurrent COPYs never race on CREATE TABLE.
+    columns = {tsv: tsv_columns(tsv) for tsv in tsvs}
+    for tsv in tsvs:
+        ensure_table(table, columns[tsv], engine)
+
+    # COPY work is server-side and I/O bound, so threads sharing the engine's
+    # pool are enough; each file commits on its own connection.
+    with ThreadPoolExecutor(max_workers=min(MAX_LOAD_WORKERS, os.cpu_count() or 1)) as executor:
+        return sum(executor.map(lambda tsv: copy_tsv(tsv, columns[tsv], table, engine), tsvs))